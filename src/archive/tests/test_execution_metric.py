@@ -11,9 +11,12 @@ from metrics.execution_metric import ExecutionVerifier
 from core.schema import SCHEMA, FOREIGN_KEYS
 
 class TestExecutionVerifier(unittest.TestCase):
-    def setUp(self):
-        # Use Real Schema
-        self.verifier = ExecutionVerifier(SCHEMA, FOREIGN_KEYS)
+    @classmethod
+    def setUpClass(cls):
+        # Use Real Schema. One verifier for the whole class: construction
+        # precomputes row-generation plans, and each verify() call builds
+        # its own database anyway, so the tests share no mutable state.
+        cls.verifier = ExecutionVerifier(SCHEMA, FOREIGN_KEYS)
 
     def test_basic_match(self):
         # Even with random data, identical SQL should match
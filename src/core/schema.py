@@ -56,3 +56,32 @@ NUMERIC_TYPES = {"int"}
 TEXT_TYPES = {"varchar", "text"}
 DATE_TYPES = {"datetime"}
 BOOLEAN_TYPES = {"boolean"}
+
+
+def _build_schema_text() -> str:
+    """Render SCHEMA and FOREIGN_KEYS as LLM prompt context text."""
+    schema_lines = ["Database Schema:", ""]
+
+    # Format tables and columns
+    schema_lines.append("TABLES:")
+    for table_name, columns in SCHEMA.items():
+        col_defs = [f"{col_name} {col_type.upper()}" for col_name, col_type in columns.items()]
+        schema_lines.append(f"  - {table_name} ({', '.join(col_defs)})")
+
+    schema_lines.append("")
+    schema_lines.append("FOREIGN KEY RELATIONSHIPS:")
+
+    # Format foreign keys (deduplicate bidirectional relationships)
+    seen_fks = set()
+    for (left_table, right_table), (left_key, right_key) in FOREIGN_KEYS.items():
+        fk_tuple = tuple(sorted([(left_table, left_key), (right_table, right_key)]))
+        if fk_tuple not in seen_fks:
+            seen_fks.add(fk_tuple)
+            schema_lines.append(f"  - {left_table}.{left_key} -> {right_table}.{right_key}")
+
+    return "\n".join(schema_lines)
+
+
+# The schema is static, so its prompt rendering is a constant: built once at
+# import, consumers just reference it.
+SCHEMA_TEXT = _build_schema_text()
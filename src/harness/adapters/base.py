@@ -2,6 +2,7 @@
 Abstract Base Class for Model Adapters.
 """
 
+import asyncio
 from abc import ABC, abstractmethod
 from typing import List, Dict, Any
 
@@ -15,15 +16,32 @@ class BaseModelAdapter(ABC):
     def generate(self, prompts: List[str]) -> List[str]:
         """
         Generate completions for a batch of prompts.
-        
+
         Args:
             prompts: A list of input strings.
-            
+
         Returns:
             A list of raw string completions corresponding 1:1 to the input prompts.
         """
         pass
 
+    async def generate_async(self, prompts: List[str]) -> List[str]:
+        """
+        Async variant of generate() used by the asyncio execution path.
+
+        The default implementation offloads the blocking generate() call to a
+        worker thread, so every adapter works out of the box. Adapters whose
+        SDKs expose native async clients should override this to avoid the
+        thread hop entirely.
+
+        Args:
+            prompts: A list of input strings.
+
+        Returns:
+            A list of raw string completions corresponding 1:1 to the input prompts.
+        """
+        return await asyncio.to_thread(self.generate, prompts)
+
     @abstractmethod
     def model_name(self) -> str:
         """Return the specific model identifier (e.g., 'gemini-1.5-pro')."""
@@ -58,6 +58,35 @@ class GeminiAdapter(BaseModelAdapter):
                 results.append("")  # Empty result indicates failure
         return results
 
+    async def generate_async(self, prompts: List[str]) -> List[str]:
+        """
+        Native async generation via the SDK's aio client.
+
+        Overrides the to_thread default from BaseModelAdapter: requests await
+        on the event loop directly instead of parking a worker thread per
+        in-flight call, so the engine's concurrency ceiling costs coroutine
+        frames rather than thread stacks.
+        """
+        results = []
+        for prompt in prompts:
+            try:
+                formatted_prompt = self.format_prompt(prompt)
+
+                response = await self.client.aio.models.generate_content(
+                    model=self._model_name,
+                    contents=formatted_prompt,
+                    config=types.GenerateContentConfig(
+                        temperature=0.0,
+                        max_output_tokens=512
+                    )
+                )
+                results.append(response.text or "")
+            except Exception as e:
+                import logging
+                logging.error(f"Gemini API error: {str(e)}")
+                results.append("")  # Empty result indicates failure
+        return results
+
     def model_name(self) -> str:
         return self._model_name
 
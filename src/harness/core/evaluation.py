@@ -3,6 +3,7 @@ Evaluation Logic Component.
 Integrates existing metrics to evaluate generated SQL.
 Enhanced with semantic comparison for fair evaluation.
 """
+import functools
 from enum import Enum
 from dataclasses import dataclass
 from typing import Optional, Dict, Any, Tuple
@@ -23,6 +24,7 @@ class FailureType(Enum):
     EXECUTION_ERROR = "execution_error"
     MISMATCH = "mismatch"
     EMPTY = "empty"
+    GENERATION_FAILED = "generation_failed"
 
 @dataclass
 class EvaluationResult:
@@ -41,14 +43,22 @@ class Evaluator:
         self.PERFECT_SIMILARITY_THRESHOLD = 0.98  # Near-perfect TED score
         self.HIGH_SIMILARITY_THRESHOLD = 0.90     # High similarity
 
-    def evaluate(self, gold_sql: str, gen_sql: str) -> EvaluationResult:
+    @functools.lru_cache(maxsize=4096)
+    def evaluate(self, gold_sql: str, gen_sql: str,
+                 gold_normalized: Optional[str] = None) -> EvaluationResult:
         """
         Evaluate a single generated SQL against the gold standard.
-        
+        Memoized on (gold_sql, gen_sql): deduplicated perturbations frequently
+        produce identical pairs, and the result is deterministic.
+
         Uses multi-level evaluation:
         1. TED similarity score (structural)
         2. Semantic normalization comparison
         3. Execution verification (with caveats)
+
+        gold_normalized: optional precomputed semantic_normalize_sql(gold_sql).
+        The same gold SQL is evaluated once per perturbation, so callers that
+        normalize it once per query avoid ~8x redundant parses on the gold side.
         """
         if not gen_sql:
             return EvaluationResult(0.0, False, FailureType.EMPTY.value)
@@ -61,8 +71,9 @@ class Evaluator:
             ted_score = 0.0
         
         # 2. Semantic Comparison
-        semantic_match = self._check_semantic_equivalence(gold_sql, gen_sql, ted_score)
-        
+        semantic_match = self._check_semantic_equivalence(gold_sql, gen_sql, ted_score,
+                                                          gold_normalized=gold_normalized)
+
         # 3. Execution Verification (with known limitations)
         # NOTE: Execution verifier is currently NON-FUNCTIONAL for UPDATE/DELETE/INSERT
         # due to bugs identified in analysis. We rely primarily on semantic comparison.
@@ -98,9 +109,13 @@ class Evaluator:
         )
     # For Agent--- Remove After Executed: This block of code seems redundant as the logic seems to have been implemented partly already in the evaluate function. So needs refactoring
 
+    @functools.lru_cache(maxsize=200_000)
     def fast_evaluate(self, gold_sql: str, gen_sql: str) -> EvaluationResult:
         """
         Fast evaluation that SKIPS execution verifier entirely.
+        Memoized on (gold_sql, gen_sql): the function is deterministic and the
+        re-evaluation workload repeats pairs heavily across perturbations and
+        runs, so cache hits skip the sqlglot parses outright.
         
         Uses only:
         1. TED similarity score
@@ -139,7 +154,8 @@ class Evaluator:
         )
 
     
-    def _check_semantic_equivalence(self, gold_sql: str, gen_sql: str, ted_score: float) -> bool:
+    def _check_semantic_equivalence(self, gold_sql: str, gen_sql: str, ted_score: float,
+                                    gold_normalized: Optional[str] = None) -> bool:
         """
         Check if two SQL queries are semantically equivalent.
         
@@ -157,7 +173,7 @@ class Evaluator:
         from src.harness.core.normalization import semantic_normalize_sql
         
         try:
-            norm_gold = semantic_normalize_sql(gold_sql)
+            norm_gold = gold_normalized if gold_normalized is not None else semantic_normalize_sql(gold_sql)
             norm_gen = semantic_normalize_sql(gen_sql)
             
             if norm_gold == norm_gen:
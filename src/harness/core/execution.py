@@ -2,23 +2,70 @@
 Execution Engine.
 Orchestrates the generation and evaluation loop.
 """
+import asyncio
+import atexit
+import itertools
 import json
 import os
+import queue
+import random
 import time
 import uuid
 import sys
 import threading
-from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, field, is_dataclass
+from datetime import datetime, timedelta
 from typing import List, Dict, Any, Optional, Tuple
 from tqdm.auto import tqdm
-from concurrent.futures import ThreadPoolExecutor, as_completed
 from ..adapters.base import BaseModelAdapter
-from .normalization import normalize_sql
-from .evaluation import Evaluator
+from .normalization import normalize_sql, semantic_normalize_sql
+from .evaluation import Evaluator, EvaluationResult, FailureType
+
+# orjson serializes in C and returns bytes; fall back to stdlib json where the
+# wheel is unavailable.
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# ijson streams top-level array items instead of materializing the whole
+# document; fall back to json.load where it is unavailable.
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+# Below this many queries, process-pool startup costs more than the
+# extraction work it parallelizes.
+_PARALLEL_EXTRACT_THRESHOLD = 512
+
+
+def _is_rate_limit_error(error_str: str) -> bool:
+    """Heuristic: 429/RESOURCE_EXHAUSTED rate limits and 503 overload errors."""
+    return ('429' in error_str or 'RESOURCE_EXHAUSTED' in error_str
+            or 'rate' in error_str.lower() or '503' in error_str)
 
 # Import schema for prompt construction
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../')))
-from src.core.schema import SCHEMA, FOREIGN_KEYS
+from src.core.schema import SCHEMA, FOREIGN_KEYS, SCHEMA_TEXT
+
+# Prompt template halves, assembled once at import: the schema text and the
+# instructions never change, so per-prompt construction is a single
+# concatenation of two constant references around the NL task.
+_PROMPT_PREFIX = f"""{SCHEMA_TEXT}
+
+You are a SQL expert. Generate the exact raw SQL query to handle the following task:
+
+Task: """
+_PROMPT_SUFFIX = """
+
+Requirements:
+1. Return ONLY the SQL query, no explanations or additional text
+2. Do not include markdown formatting or code blocks
+3. Generate syntactically correct MySQL-compatible SQL
+
+SQL:"""
 
 
 class TokenBucket:
@@ -27,6 +74,9 @@ class TokenBucket:
     Allows bursts while maintaining average rate over time.
     """
     
+    # Tokens are tracked in thousandths so refill math stays in integers
+    _SCALE = 1000
+
     def __init__(self, rate_per_minute: float, max_tokens: Optional[float] = None):
         """
         Args:
@@ -35,47 +85,195 @@ class TokenBucket:
         """
         self.rate_per_second = rate_per_minute / 60.0
         self.max_tokens = max_tokens or rate_per_minute
-        self.tokens = self.max_tokens
-        self.last_update = time.time()
+        # Integer accounting: millitokens + monotonic nanoseconds. monotonic_ns
+        # is a cheap vDSO call (unlike time.time on some platforms) and integer
+        # updates keep the lock hold time to a few arithmetic ops.
+        self._max_millitokens = int(self.max_tokens * self._SCALE)
+        self._millitokens = self._max_millitokens
+        self._millitokens_per_ns = (self.rate_per_second * self._SCALE) / 1e9
+        self._last_ns = time.monotonic_ns()
         self.lock = threading.Lock()
-    
+
+    def _reserve(self, tokens: int) -> float:
+        """
+        Refill from elapsed monotonic time and reserve tokens.
+
+        Returns the time in seconds the caller must wait before its
+        reservation is honored (0.0 if tokens were available).
+        """
+        needed = tokens * self._SCALE
+
+        with self.lock:
+            now_ns = time.monotonic_ns()
+            refill = int((now_ns - self._last_ns) * self._millitokens_per_ns)
+            self._millitokens = min(self._max_millitokens, self._millitokens + refill)
+            self._last_ns = now_ns
+
+            if self._millitokens >= needed:
+                self._millitokens -= needed
+                return 0.0
+
+            shortfall = needed - self._millitokens
+            self._millitokens = 0
+            return shortfall / (self.rate_per_second * self._SCALE)
+
     def acquire(self, tokens: int = 1) -> float:
         """
         Acquire tokens from the bucket, blocking if necessary.
-        
+
         Args:
             tokens: Number of tokens to acquire
-            
+
         Returns:
             Time waited in seconds
         """
-        wait_time = 0.0
-        
-        with self.lock:
-            now = time.time()
-            elapsed = now - self.last_update
-            
-            # Refill bucket based on elapsed time
-            self.tokens = min(self.max_tokens, self.tokens + elapsed * self.rate_per_second)
-            self.last_update = now
-            
-            # Check if we have enough tokens
-            if self.tokens >= tokens:
-                self.tokens -= tokens
-            else:
-                # Calculate wait time for required tokens
-                tokens_needed = tokens - self.tokens
-                wait_time = tokens_needed / self.rate_per_second
-                self.tokens = 0
-        
+        wait_time = self._reserve(tokens)
+
         # Wait outside the lock to allow other threads to check
         if wait_time > 0:
             time.sleep(wait_time)
-        
+
+        return wait_time
+
+    async def acquire_async(self, tokens: int = 1) -> float:
+        """
+        Async version of acquire: same bucket accounting, but the wait is an
+        asyncio.sleep so coroutines yield instead of blocking the event loop.
+
+        Args:
+            tokens: Number of tokens to acquire
+
+        Returns:
+            Time waited in seconds
+        """
+        wait_time = self._reserve(tokens)
+
+        # Yield to the event loop instead of blocking a thread
+        if wait_time > 0:
+            await asyncio.sleep(wait_time)
+
         return wait_time
 
+class DynamicSemaphore:
+    """
+    AIMD-tuned concurrency limiter for the asyncio execution path.
+
+    Fixed high concurrency caps hurt both latency and throughput once the API
+    is saturated, so instead of trusting a blind default this starts low,
+    additively grows one permit per batch of clean completions, and halves on
+    rate-limit errors. All bookkeeping happens on the event-loop thread, so no
+    locking is needed.
+    """
+
+    # Completions without a rate-limit error before granting one more permit
+    GROWTH_INTERVAL = 32
+
+    def __init__(self, initial: int, min_permits: int = 1, max_permits: int = 100):
+        self.min_permits = max(1, min_permits)
+        self.max_permits = max_permits
+        self.permits = max(self.min_permits, min(initial, max_permits))
+        self._sem = asyncio.Semaphore(self.permits)
+        self._to_revoke = 0   # permits to swallow on release after a decrease
+        self._successes = 0
+
+    async def acquire(self):
+        await self._sem.acquire()
+
+    def release(self):
+        if self._to_revoke > 0:
+            self._to_revoke -= 1
+        else:
+            self._sem.release()
+
+    def record_success(self):
+        """Additive increase: one extra permit per GROWTH_INTERVAL clean completions."""
+        self._successes += 1
+        if self._successes >= self.GROWTH_INTERVAL and self.permits < self.max_permits:
+            self._successes = 0
+            self.permits += 1
+            self._sem.release()
+
+    def record_rate_limit(self):
+        """Multiplicative decrease: halve the concurrency window on 429/503."""
+        self._successes = 0
+        target = max(self.min_permits, self.permits // 2)
+        self._to_revoke += self.permits - target
+        self.permits = target
+
+
+@dataclass
+class PromptColumns:
+    """
+    Columnar (struct-of-arrays) storage for test cases.
+
+    Instead of ~16,800 per-case dicts, each attribute lives in one parallel
+    list indexed by test-case position. Workers read the columns they need
+    directly; the full per-case dict is only materialized at record-creation
+    time via case().
+    """
+    prompt_id: List[Any] = field(default_factory=list)
+    prompt_text: List[str] = field(default_factory=list)
+    sql: List[str] = field(default_factory=list)
+    gold_normalized: List[str] = field(default_factory=list)
+    complexity: List[str] = field(default_factory=list)
+    tables: List[List[str]] = field(default_factory=list)
+    perturbation_type: List[str] = field(default_factory=list)
+    perturbation_id: List[Any] = field(default_factory=list)
+    metadata: List[Dict[str, Any]] = field(default_factory=list)
+
+    _FIELDS = ('prompt_id', 'prompt_text', 'sql', 'gold_normalized', 'complexity',
+               'tables', 'perturbation_type', 'perturbation_id', 'metadata')
+
+    def __len__(self) -> int:
+        return len(self.prompt_id)
+
+    def add_cases(self, cases: List[Dict[str, Any]]):
+        """Append a batch of test-case dicts into the columns."""
+        for case in cases:
+            for name in self._FIELDS:
+                getattr(self, name).append(case.get(name))
+
+    def case(self, i: int) -> Dict[str, Any]:
+        """Materialize the test-case dict at index i (record-creation time only)."""
+        return {name: getattr(self, name)[i] for name in self._FIELDS}
+
+    def filter(self, predicate) -> "PromptColumns":
+        """Return a new PromptColumns with only the cases whose dict passes predicate."""
+        kept = PromptColumns()
+        kept.add_cases(self.case(i) for i in range(len(self)) if predicate(self.case(i)))
+        return kept
+
+
+@dataclass(slots=True)
+class PromptRecord:
+    """
+    One output log line, as a slotted dataclass instead of a ~15-key dict.
+
+    Workers build one of these per test case; slots keep the per-record
+    footprint to a fixed attribute table rather than a hash table, which
+    matters at tens of thousands of records per run. orjson serializes
+    dataclasses natively, so logging stays a single dumps() call.
+    """
+    run_id: str
+    model_name: str
+    model_family: str
+    prompt_id: str
+    prompt_text: str
+    perturbation_type: str
+    perturbation_id: Any
+    query_complexity: str
+    tables_involved: List[str]
+    gold_sql: str
+    raw_output: str
+    normalized_sql: str
+    evaluation_result: Dict[str, Any]
+    decoding_config: Dict[str, Any]
+    metadata: Dict[str, Any]
+    timestamp: str
+
+
 class ExecutionEngine:
-    
+
     def __init__(self, adapter: BaseModelAdapter, run_id: str, output_path: str, rate_limit_config: Dict[str, Any] = None):
         self.adapter = adapter
         self.run_id = run_id
@@ -83,12 +281,44 @@ class ExecutionEngine:
         self.evaluator = Evaluator()
         self.schema = SCHEMA
         self.foreign_keys = FOREIGN_KEYS
-        
+
+        # Bind the import-time prompt template constants; construction costs
+        # two references, not a fresh assembly of the ~1 KB schema text.
+        self._schema_text = self._format_schema_text()
+        self._prompt_prefix = _PROMPT_PREFIX
+        self._prompt_suffix = _PROMPT_SUFFIX
+
         # Create output directory if it doesn't exist
         output_dir = os.path.dirname(output_path)
         if output_dir and not os.path.exists(output_dir):
             os.makedirs(output_dir, exist_ok=True)
-        
+
+        # Open the log once with a large buffer instead of re-opening per
+        # record: saves an open/close syscall pair for every test case.
+        # Binary mode so orjson's bytes output is written without re-encoding.
+        self._log_fh = open(output_path, 'ab', buffering=1 << 20)
+        self._log_lock = threading.Lock()
+
+        # Multi-producer queue drained by one writer thread: workers enqueue
+        # and return immediately, and the writer coalesces up to
+        # _WRITE_BATCH records per writelines() call.
+        self._log_q: "queue.Queue" = queue.Queue(maxsize=1024)
+        self._writer_thread = threading.Thread(target=self._writer_loop, daemon=True)
+        self._writer_thread.start()
+        atexit.register(self.close)
+
+        # Timestamp anchor: sample the wall clock once and derive per-record
+        # timestamps from the monotonic offset, avoiding a wall-clock read and
+        # tz bookkeeping on every record.
+        self._t0_wall = datetime.utcnow()
+        self._t0_mono = time.monotonic()
+
+        # Process-wide circuit breaker: set() means requests may flow. A worker
+        # that hits a rate limit clears it so every worker pauses together
+        # instead of retrying independently into the same 429 wall.
+        self._breaker = threading.Event()
+        self._breaker.set()
+
         # Rate limiting configuration
         self.rate_limit_config = rate_limit_config or {}
         self.requests_per_minute = self.rate_limit_config.get('requests_per_minute', None)
@@ -103,11 +333,11 @@ class ExecutionEngine:
             self.batch_delay = 0
             print(f"⚡ No rate limiting (local model or unlimited API)")
         
-        # Determine batch size
+        # Determine batch size (overridable via rate_limit_config)
         if adapter.model_family() == "open": # VLLM
-            self.batch_size = 32
+            self.batch_size = self.rate_limit_config.get('batch_size', 32)
         else: # API
-            self.batch_size = 5
+            self.batch_size = self.rate_limit_config.get('batch_size', 5)
         
         # Concurrent execution settings
         self.max_concurrent = self.rate_limit_config.get('max_concurrent_requests', None)
@@ -139,49 +369,94 @@ class ExecutionEngine:
         # 2. Execute with concurrency
         print(f"Processing {len(prompts_data)} prompts with max {self.max_concurrent} concurrent requests...")
 
-        # Track statistics for progress tracking
-        total_processed = 0
-        total_correct = 0
-        
-        # Thread-safe counter and lock for statistics
-        stats_lock = threading.Lock()
-        
-        pbar_lock = threading.Lock()
-        
-        def process_single_prompt(prompt_item: Dict[str, Any]):
-            """Process a single prompt: generate, normalize, evaluate, return record."""
-            nonlocal total_processed, total_correct
-            
-            # Rate limiting: acquire token before making request
+        # Lock-free statistics: itertools.count increments atomically under the
+        # CPython GIL (the iterator is implemented in C), so completing a record
+        # costs no mutex acquisition on the hot path.
+        processed_counter = itertools.count(1)
+        correct_counter = itertools.count(1)
+
+        def _count_value(counter) -> int:
+            """Peek at a count() without consuming it (reduce state holds the next value)."""
+            return counter.__reduce__()[1][0] - 1
+
+        async def process_prompt_group_async(indices: List[int], sem: "DynamicSemaphore"):
+            """
+            Generate once for a group of test cases sharing the same prompt
+            text, then broadcast the raw output to each case. Evaluation stays
+            per-case (gold SQL can differ across the group).
+            """
+            # Rate limiting: acquire token before making request (yields, never blocks the loop)
             if self.token_bucket:
-                self.token_bucket.acquire(1)
-            
-            # Construct full prompt with schema context
-            prompt_text = self._construct_full_prompt(prompt_item['prompt_text'])
-            
+                await self.token_bucket.acquire_async(1)
+
+            # Construct full prompt with schema context (column read, no dict)
+            prompt_text = self._construct_full_prompt(prompts_data.prompt_text[indices[0]])
+
             # Generate (adapter handles single prompt)
             try:
-                raw_output = self.adapter.generate([prompt_text])[0]
+                raw_output = (await self.adapter.generate_async([prompt_text]))[0]
+                sem.record_success()
             except Exception as e:
                 import logging
-                logging.error(f"Generation failed for prompt {prompt_item.get('prompt_id', 'unknown')}: {e}")
+                logging.error(f"Generation failed for prompt {prompts_data.prompt_id[indices[0]]}: {e}")
+                # Feed the concurrency controller: back off hard on rate limits
+                if _is_rate_limit_error(str(e)):
+                    sem.record_rate_limit()
                 raw_output = ""
-            
-            # Process the result
-            record, is_correct = self._create_record_from_result(prompt_item, raw_output)
-            
-            # Update statistics (thread-safe)
-            with stats_lock:
-                total_processed += 1
+
+            for i in indices:
+                # Process the result (the per-case dict is built only here, at record time)
+                record, is_correct = self._create_record_from_result(prompts_data.case(i), raw_output)
+
+                # Update statistics (atomic C-level increments, no critical section)
+                next(processed_counter)
                 if is_correct:
-                    total_correct += 1
-            
-            # Log immediately
-            self._log_record(record)
-            
-            return record
+                    next(correct_counter)
+
+                # Enqueue for the writer thread; workers never touch the file
+                self._log_record(record)
+
+        async def run_all_async():
+            """Fan out all prompts under an adaptive semaphore; coroutine frames instead of threads."""
+            # Start conservatively and let AIMD feedback find the sweet spot;
+            # max_concurrent becomes the ceiling rather than the blind default.
+            sem = DynamicSemaphore(initial=min(4, self.max_concurrent),
+                                   max_permits=self.max_concurrent)
+
+            # Deduplicate identical prompt texts: perturbations frequently
+            # collapse to the same NL string, and each duplicate would cost a
+            # full LLM call for an answer we already have.
+            groups: Dict[str, List[int]] = {}
+            for i, text in enumerate(prompts_data.prompt_text):
+                groups.setdefault(text, []).append(i)
+            if len(groups) < len(prompts_data):
+                print(f"♻️  Deduplicated {len(prompts_data) - len(groups)} identical prompts "
+                      f"({len(groups)} unique LLM calls)")
+
+            with tqdm(total=len(prompts_data), desc="Processing Prompts", unit="prompt") as pbar:
+                async def bounded(indices):
+                    await sem.acquire()
+                    try:
+                        await process_prompt_group_async(indices, sem)
+                    finally:
+                        sem.release()
+                    for _ in indices:
+                        update_pbar(pbar)
 
-        def update_pbar(pbar, _total_processed, _total_correct):        
+                results = await asyncio.gather(
+                    *[bounded(indices) for indices in groups.values()],
+                    return_exceptions=True
+                )
+                for res in results:
+                    if isinstance(res, Exception):
+                        import logging
+                        logging.error(f"Task failed: {res}")
+                        pbar.update(1)
+
+        def update_pbar(pbar):
+            # Sample the counters for display; the workers never block on this
+            _total_processed = _count_value(processed_counter)
+            _total_correct = _count_value(correct_counter)
             current_accuracy = (_total_correct / _total_processed * 100) if _total_processed > 0 else 0
             pbar.set_postfix_str(f"Correct: {_total_correct}/{_total_processed} ({current_accuracy:.1f}%)")
             pbar.update(1)
@@ -189,64 +464,66 @@ class ExecutionEngine:
         # Choose execution strategy based on model family
         start_time = time.time()
         if self.adapter.model_family() == "open":
-            # BATCHED EXECUTION for local models (vLLM)
-            print("🚀 Using BATCHED execution for local model (chunk_size=500)...")
-            chunk_size = 500
-            
+            # BATCHED EXECUTION for local models (vLLM): submit batch_size
+            # prompts per generate() call so vLLM's internal continuous
+            # batching sees real batches instead of batches of 1.
+            print(f"🚀 Using BATCHED execution for local model (batch_size={self.batch_size})...")
+
+            # Run-wide output cache keyed by prompt text: duplicated prompts
+            # (perturbations that collapse to the same NL string) cost one
+            # generation, mirroring the dedupe on the concurrent path.
+            generated_cache: Dict[str, str] = {}
+
             with tqdm(total=len(prompts_data), desc="Processing Prompts", unit="prompt") as pbar:
-                for i in range(0, len(prompts_data), chunk_size):
-                    chunk = prompts_data[i:i + chunk_size]
-                    
-                    # 1. Prepare prompts
-                    chunk_prompts = [self._construct_full_prompt(p['prompt_text']) for p in chunk]
-                    
-                    # 2. Generate batch
-                    try:
-                        chunk_outputs = self.adapter.generate(chunk_prompts)
-                    except Exception as e:
-                        print(f"ERROR: Batch generation failed: {e}")
-                        chunk_outputs = [""] * len(chunk)
-                    
-                    # 3. Process results
-                    for prompt_item, raw_output in zip(chunk, chunk_outputs):
-                        record, is_correct = self._create_record_from_result(prompt_item, raw_output)
+                for i in range(0, len(prompts_data), self.batch_size):
+                    chunk_indices = range(i, min(i + self.batch_size, len(prompts_data)))
+                    chunk_texts = [prompts_data.prompt_text[j] for j in chunk_indices]
+
+                    # 1. Prepare prompts for texts not generated yet (order-
+                    #    preserving dedupe within the chunk via dict.fromkeys)
+                    pending = [t for t in dict.fromkeys(chunk_texts) if t not in generated_cache]
+                    chunk_prompts = [self._construct_full_prompt(t) for t in pending]
+
+                    # 2. Generate batch of unique prompts
+                    if chunk_prompts:
+                        try:
+                            outputs = self.adapter.generate(chunk_prompts)
+                        except Exception as e:
+                            print(f"ERROR: Batch generation failed: {e}")
+                            outputs = [""] * len(chunk_prompts)
+                        generated_cache.update(zip(pending, outputs))
+
+                    # 3. Process results (duplicates replay the cached output)
+                    chunk_outputs = [generated_cache.get(t, "") for t in chunk_texts]
+                    for j, raw_output in zip(chunk_indices, chunk_outputs):
+                        record, is_correct = self._create_record_from_result(prompts_data.case(j), raw_output)
                         self._log_record(record)
-                        
+
                         # Update progress locally for the chunk loop
-                        total_processed += 1
+                        next(processed_counter)
                         if is_correct:
-                            total_correct += 1
-                        
+                            next(correct_counter)
+
                         # Update pbar
-                        update_pbar(pbar, total_processed, total_correct)
+                        update_pbar(pbar)
                         
         else:
-            # CONCURRENT EXECUTION for API models
-            with ThreadPoolExecutor(max_workers=self.max_concurrent) as executor:
-                # Submit all tasks
-                future_to_prompt = {
-                    executor.submit(process_single_prompt, prompt): prompt 
-                    for prompt in prompts_data
-                }
-                
-                # Process completed tasks with progress bar
-                with tqdm(total=len(prompts_data), desc="Processing Prompts", unit="prompt") as pbar:
-                    for future in as_completed(future_to_prompt):
-                        try:
-                            future.result()
-                            # Stats are updated inside process_single_prompt
-                            update_pbar(pbar, total_processed, total_correct)
-                            
-                        except Exception as e:
-                            import logging
-                            logging.error(f"Task failed: {e}")
-                            pbar.update(1)
-        
+            # CONCURRENT EXECUTION for API models via asyncio:
+            # thousands of in-flight requests cost coroutine frames (~KBs),
+            # not thread stacks (~1MB each), and completions are processed
+            # on a single loop without GIL context-switch overhead.
+            asyncio.run(run_all_async())
+
+        # Make sure every record is on disk before reporting
+        self._drain_logs()
+
         # Calculate throughput
         elapsed_time = time.time() - start_time
         throughput_rpm = (len(prompts_data) / elapsed_time) * 60 if elapsed_time > 0 else 0
         
         # Print final summary
+        total_processed = _count_value(processed_counter)
+        total_correct = _count_value(correct_counter)
         final_accuracy = (total_correct / total_processed * 100) if total_processed > 0 else 0
         print(f"\\n{'='*70}")
         print(f"Execution Complete!")
@@ -260,37 +537,46 @@ class ExecutionEngine:
             print(f"  Rate Limit Utilization: {utilization:.1f}%")
         print(f"{'='*70}")
 
-    def _create_record_from_result(self, prompt_item: Dict[str, Any], raw_output: str) -> Tuple[Dict[str, Any], bool]:
+    def _create_record_from_result(self, prompt_item: Dict[str, Any], raw_output: str) -> Tuple[PromptRecord, bool]:
         """Helper to creation record and update stats safely."""
-        # Normalize
-        normalized_sql = normalize_sql(raw_output)
-        
-        # Evaluate
         gold_sql = prompt_item.get('sql', '')
-        eval_result = self.evaluator.evaluate(gold_sql, normalized_sql)
-        
-        record = {
-            "run_id": self.run_id,
-            "model_name": self.adapter.model_name(),
-            "model_family": self.adapter.model_family(),
-            "prompt_id": prompt_item.get('prompt_id', str(uuid.uuid4())),
-            "prompt_text": prompt_item['prompt_text'],
-            "perturbation_type": prompt_item.get('perturbation_type', 'unknown'),
-            "perturbation_id": prompt_item.get('perturbation_id', -1),
-            "query_complexity": prompt_item.get('complexity', 'unknown'),
-            "tables_involved": prompt_item.get('tables', []),
-            "gold_sql": gold_sql,
-            "raw_output": raw_output,
-            "normalized_sql": normalized_sql,
-            "evaluation_result": {
+
+        if not raw_output:
+            # Generation failed upstream (rate limit / adapter error): there is
+            # nothing to normalize or parse, so return a canned failure instead
+            # of running the evaluator against the gold SQL.
+            normalized_sql = ""
+            eval_result = EvaluationResult(0.0, False, FailureType.GENERATION_FAILED.value)
+        else:
+            # Normalize
+            normalized_sql = normalize_sql(raw_output)
+
+            # Evaluate
+            eval_result = self.evaluator.evaluate(gold_sql, normalized_sql,
+                                                  gold_normalized=prompt_item.get('gold_normalized'))
+        
+        record = PromptRecord(
+            run_id=self.run_id,
+            model_name=self.adapter.model_name(),
+            model_family=self.adapter.model_family(),
+            prompt_id=prompt_item.get('prompt_id', str(uuid.uuid4())),
+            prompt_text=prompt_item['prompt_text'],
+            perturbation_type=prompt_item.get('perturbation_type', 'unknown'),
+            perturbation_id=prompt_item.get('perturbation_id', -1),
+            query_complexity=prompt_item.get('complexity', 'unknown'),
+            tables_involved=prompt_item.get('tables', []),
+            gold_sql=gold_sql,
+            raw_output=raw_output,
+            normalized_sql=normalized_sql,
+            evaluation_result={
                 "correctness": eval_result.execution_match,
                 "similarity_score": eval_result.similarity_score,
                 "failure_type": eval_result.failure_type
             },
-            "decoding_config": self.adapter.decoding_config(),
-            "metadata": prompt_item.get('metadata', {}),
-            "timestamp": datetime.utcnow().isoformat()
-        }
+            decoding_config=self.adapter.decoding_config(),
+            metadata=prompt_item.get('metadata', {}),
+            timestamp=(self._t0_wall + timedelta(seconds=time.monotonic() - self._t0_mono)).isoformat()
+        )
         return record, eval_result.execution_match
 
     
@@ -305,18 +591,26 @@ class ExecutionEngine:
             List of generated SQL strings (empty string on failure)
         """
         for attempt in range(self.max_retries + 1):
+            # If another worker tripped the breaker, wait out the pause first
+            self._breaker.wait()
             try:
                 return self.adapter.generate(prompt_texts)
             except Exception as e:
                 error_str = str(e)
                 # Check if it's a rate limit error (429 or RESOURCE_EXHAUSTED) or Service Unavailable (503)
-                is_rate_limit = '429' in error_str or 'RESOURCE_EXHAUSTED' in error_str or 'rate' in error_str.lower() or '503' in error_str
-                
+                is_rate_limit = _is_rate_limit_error(error_str)
+
                 if is_rate_limit and attempt < self.max_retries:
-                    # Exponential backoff: 2, 4, 8 seconds
-                    delay = 2 ** (attempt + 1)
-                    print(f"  ⚠️  Rate limit hit, retrying in {delay}s... (attempt {attempt + 1}/{self.max_retries})")
-                    time.sleep(delay)
+                    # Decorrelated jitter (capped) so retries don't thunder
+                    # back in lockstep the moment the limit clears
+                    delay = random.uniform(1.0, min(30.0, 2 ** (attempt + 1)))
+                    print(f"  ⚠️  Rate limit hit, retrying in {delay:.1f}s... (attempt {attempt + 1}/{self.max_retries})")
+                    # Trip the shared breaker so all workers back off together
+                    self._breaker.clear()
+                    try:
+                        time.sleep(delay)
+                    finally:
+                        self._breaker.set()
                 else:
                     # Non-rate-limit error or out of retries - return empty strings
                     import logging
@@ -326,140 +620,120 @@ class ExecutionEngine:
         # Should never reach here, but just in case
         return [""] * len(prompt_texts)
                 
-    def _load_prompts(self, path: str) -> List[Dict[str, Any]]:
+    def _load_prompts(self, path: str) -> PromptColumns:
         """
         Load prompts from JSON or JSONL, extracting ALL perturbations.
-        
+
         For each query in the dataset, this creates:
         - 1 test case for the original prompt
         - N test cases for each applicable perturbation
-        
+
         This expands ~2100 queries to ~16,800 test cases.
+
+        Query items are streamed (via ijson for JSON arrays, line-by-line for
+        JSONL) so the raw document is never fully materialized alongside the
+        expanded list, and extraction fans out to a process pool for large
+        datasets.
         """
-        data = []
-        with open(path, 'r') as f:
+        def stream_items():
             if path.endswith('.jsonl'):
-                for line in f:
-                    if line.strip():
-                        item = json.loads(line)
-                        data.extend(self._extract_all_prompts_from_query(item))
+                with open(path, 'r') as f:
+                    for line in f:
+                        if line.strip():
+                            yield json.loads(line)
+            elif ijson is not None:
+                with open(path, 'rb') as f:
+                    yield from ijson.items(f, 'item', use_float=True)
             else:
                 # Assume standard JSON list (our nl_social_media_queries.json format)
-                content = json.load(f)
-                for item in content:
-                    data.extend(self._extract_all_prompts_from_query(item))
-                    
+                with open(path, 'r') as f:
+                    yield from json.load(f)
+
+        data = PromptColumns()
+        items = stream_items()
+        head = list(itertools.islice(items, _PARALLEL_EXTRACT_THRESHOLD))
+
+        if len(head) < _PARALLEL_EXTRACT_THRESHOLD:
+            # Small dataset: pool startup would dominate, extract inline
+            for item in head:
+                data.add_cases(_extract_all_prompts_from_query(item))
+        else:
+            # Extraction is CPU-bound dict reshaping, so use processes
+            with ProcessPoolExecutor(max_workers=os.cpu_count()) as pool:
+                for cases in pool.map(_extract_all_prompts_from_query,
+                                      itertools.chain(head, items),
+                                      chunksize=256):
+                    data.add_cases(cases)
+
         return data
-    
+
     def _extract_all_prompts_from_query(self, query_item: Dict[str, Any]) -> List[Dict[str, Any]]:
-        """
-        Extract all test cases from a single query item.
-        
-        Args:
-            query_item: A single query from the dataset with perturbations.
-            
-        Returns:
-            List of test case dictionaries, one for original + one per applicable perturbation.
-        """
-        test_cases = []
-        
-        # Base metadata from query
-        query_id = query_item.get('id', str(uuid.uuid4()))
-        gold_sql = query_item.get('sql', '')
-        complexity = query_item.get('complexity', 'unknown')
-        tables = query_item.get('tables', [])
-        
-        # Check if this query has the new perturbation structure
-        if 'generated_perturbations' in query_item:
-            perturbations = query_item['generated_perturbations']
-            
-            # 1. Add original prompt
-            original = perturbations.get('original', {})
-            original_prompt = original.get('nl_prompt', query_item.get('nl_prompt', ''))
-            
-            if original_prompt:
-                test_cases.append({
-                    'prompt_id': f"{query_id}_original",
-                    'prompt_text': original_prompt,
-                    'sql': gold_sql,
-                    'complexity': complexity,
-                    'tables': tables,
-                    'perturbation_type': 'original',
-                    'perturbation_id': 0,
-                    'metadata': {
-                        'query_id': query_id,
-                        'is_perturbed': False
-                    }
-                })
-            
-            # 2. Add each applicable perturbation
-            single_perts = perturbations.get('single_perturbations', [])
-            for pert in single_perts:
-                if pert.get('applicable', False):
-                    perturbed_prompt = pert.get('perturbed_nl_prompt')
-                    if perturbed_prompt:
-                        test_cases.append({
-                            'prompt_id': f"{query_id}_pert_{pert.get('perturbation_id', pert.get('perturbation_name', 'unknown'))}",
-                            'prompt_text': perturbed_prompt,
-                            'sql': gold_sql,  # Same gold SQL for all perturbations
-                            'complexity': complexity,
-                            'tables': tables,
-                            'perturbation_type': pert.get('perturbation_name', 'unknown'),
-                            'perturbation_id': pert.get('perturbation_id', -1),
-                            'metadata': {
-                                'query_id': query_id,
-                                'is_perturbed': True,
-                                'changes_made': pert.get('changes_made', ''),
-                                'original_prompt': original_prompt
-                            }
-                        })
-            
-            # 3. Add compound perturbation
-            compound = perturbations.get('compound_perturbation', {})
-            compound_prompt = compound.get('perturbed_nl_prompt')
-            
-            if compound_prompt:
-                test_cases.append({
-                    'prompt_id': f"{query_id}_compound",
-                    'prompt_text': compound_prompt,
-                    'sql': gold_sql,
-                    'complexity': complexity,
-                    'tables': tables,
-                    'perturbation_type': 'compound',
-                    'perturbation_id': 'compound',
-                    'metadata': {
-                        'query_id': query_id,
-                        'is_perturbed': True,
-                        'changes_made': compound.get('changes_made', ''),
-                        'original_prompt': original_prompt,
-                        'perturbations_applied': compound.get('perturbations_applied', [])
-                    }
-                })
-        
-        else:
-            # Fallback for simple format without perturbations
-            nl_prompt = query_item.get('nl_prompt', query_item.get('prompt_text', ''))
-            if nl_prompt:
-                test_cases.append({
-                    'prompt_id': str(query_id),
-                    'prompt_text': nl_prompt,
-                    'sql': gold_sql,
-                    'complexity': complexity,
-                    'tables': tables,
-                    'perturbation_type': 'original',
-                    'perturbation_id': 0,
-                    'metadata': {
-                        'query_id': query_id,
-                        'is_perturbed': False
-                    }
-                })
-        
-        return test_cases
+        """Instance-level shim kept for existing callers; see module function."""
+        return _extract_all_prompts_from_query(query_item)
+
+
+
+    # Max records coalesced into one writelines() call by the writer thread
+    _WRITE_BATCH = 64
 
     def _log_record(self, record: Dict[str, Any]):
-        """Append-only logging."""
-        with open(self.output_path, 'a') as f:
-            f.write(json.dumps(record) + "\n")
+        """Append-only logging: hand the record to the writer thread and return."""
+        self._log_q.put(record)
+
+    @staticmethod
+    def _serialize_record(record) -> bytes:
+        if orjson is not None:
+            # orjson handles dataclasses natively; OPT_SERIALIZE_NUMPY because
+            # similarity scores can arrive as numpy floats
+            return orjson.dumps(record, option=orjson.OPT_SERIALIZE_NUMPY) + b"\n"
+        if is_dataclass(record):
+            record = asdict(record)
+        return (json.dumps(record) + "\n").encode('utf-8')
+
+    def _writer_loop(self):
+        """Drain the log queue, batching records into single writelines() calls."""
+        stop = False
+        while not stop:
+            record = self._log_q.get()
+            if record is None:  # Shutdown sentinel
+                self._log_q.task_done()
+                break
+
+            batch = [record]
+            while len(batch) < self._WRITE_BATCH:
+                try:
+                    nxt = self._log_q.get_nowait()
+                except queue.Empty:
+                    break
+                if nxt is None:
+                    self._log_q.task_done()
+                    stop = True
+                    break
+                batch.append(nxt)
+
+            lines = [self._serialize_record(r) for r in batch]
+            with self._log_lock:
+                if not self._log_fh.closed:
+                    self._log_fh.writelines(lines)
+            for _ in batch:
+                self._log_q.task_done()
+
+    def _drain_logs(self):
+        """Block until every enqueued record has been written, then flush."""
+        self._log_q.join()
+        with self._log_lock:
+            if not self._log_fh.closed:
+                self._log_fh.flush()
+
+    def close(self):
+        """Stop the writer, then flush and close the log handle (also via atexit)."""
+        if self._writer_thread.is_alive():
+            self._log_q.put(None)
+            self._writer_thread.join(timeout=5)
+        with self._log_lock:
+            if not self._log_fh.closed:
+                self._log_fh.flush()
+                self._log_fh.close()
     
     def _construct_full_prompt(self, nl_query: str) -> str:
         """
@@ -471,50 +745,133 @@ class ExecutionEngine:
         Returns:
             Complete prompt string ready for LLM.
         """
-        schema_text = self._format_schema_text()
-        
-        prompt = f"""{schema_text}
-
-You are a SQL expert. Generate the exact raw SQL query to handle the following task:
-
-Task: {nl_query}
-
-Requirements:
-1. Return ONLY the SQL query, no explanations or additional text
-2. Do not include markdown formatting or code blocks
-3. Generate syntactically correct MySQL-compatible SQL
-
-SQL:"""
-        
-        return prompt
+        return f"{self._prompt_prefix}{nl_query}{self._prompt_suffix}"
     
     def _format_schema_text(self) -> str:
         """
         Format the database schema as text for LLM prompt context.
-        
+
+        The schema is static, so this is now the import-time constant from
+        src.core.schema rather than a per-engine rebuild.
+
         Returns:
             Formatted string describing tables, columns, types, and foreign keys.
         """
-        schema_lines = ["Database Schema:", ""]
-        
-        # Format tables and columns
-        schema_lines.append("TABLES:")
-        for table_name, columns in self.schema.items():
-            col_defs = []
-            for col_name, col_type in columns.items():
-                col_defs.append(f"{col_name} {col_type.upper()}")
-            schema_lines.append(f"  - {table_name} ({', '.join(col_defs)})")
-        
-        schema_lines.append("")
-        schema_lines.append("FOREIGN KEY RELATIONSHIPS:")
-        
-        # Format foreign keys (deduplicate bidirectional relationships)
-        seen_fks = set()
-        for (left_table, right_table), (left_key, right_key) in self.foreign_keys.items():
-            # Create a canonical representation to avoid duplicates
-            fk_tuple = tuple(sorted([(left_table, left_key), (right_table, right_key)]))
-            if fk_tuple not in seen_fks:
-                seen_fks.add(fk_tuple)
-                schema_lines.append(f"  - {left_table}.{left_key} -> {right_table}.{right_key}")
-        
-        return "\n".join(schema_lines)
+        return SCHEMA_TEXT
+
+
+def _extract_all_prompts_from_query(query_item: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Extract all test cases from a single query item.
+
+    Module-level (rather than a method) so the process pool in _load_prompts
+    can pickle it without dragging the engine and its adapter along.
+
+    Args:
+        query_item: A single query from the dataset with perturbations.
+
+    Returns:
+        List of test case dictionaries, one for original + one per applicable perturbation.
+    """
+    test_cases = []
+
+    # Base metadata from query
+    query_id = query_item.get('id', str(uuid.uuid4()))
+    gold_sql = query_item.get('sql', '')
+    # Normalize the gold SQL once per query: the same gold_sql is shared by the
+    # original prompt and every perturbation, so evaluation should never have
+    # to reparse it per test case.
+    gold_normalized = semantic_normalize_sql(gold_sql)
+    complexity = query_item.get('complexity', 'unknown')
+    tables = query_item.get('tables', [])
+    
+    # Check if this query has the new perturbation structure
+    if 'generated_perturbations' in query_item:
+        perturbations = query_item['generated_perturbations']
+        
+        # 1. Add original prompt
+        original = perturbations.get('original', {})
+        original_prompt = original.get('nl_prompt', query_item.get('nl_prompt', ''))
+        
+        if original_prompt:
+            test_cases.append({
+                'prompt_id': f"{query_id}_original",
+                'prompt_text': original_prompt,
+                'sql': gold_sql,
+                'gold_normalized': gold_normalized,
+                'complexity': complexity,
+                'tables': tables,
+                'perturbation_type': 'original',
+                'perturbation_id': 0,
+                'metadata': {
+                    'query_id': query_id,
+                    'is_perturbed': False
+                }
+            })
+        
+        # 2. Add each applicable perturbation
+        single_perts = perturbations.get('single_perturbations', [])
+        for pert in single_perts:
+            if pert.get('applicable', False):
+                perturbed_prompt = pert.get('perturbed_nl_prompt')
+                if perturbed_prompt:
+                    test_cases.append({
+                        'prompt_id': f"{query_id}_pert_{pert.get('perturbation_id', pert.get('perturbation_name', 'unknown'))}",
+                        'prompt_text': perturbed_prompt,
+                        'sql': gold_sql,  # Same gold SQL for all perturbations
+                        'gold_normalized': gold_normalized,
+                        'complexity': complexity,
+                        'tables': tables,
+                        'perturbation_type': pert.get('perturbation_name', 'unknown'),
+                        'perturbation_id': pert.get('perturbation_id', -1),
+                        'metadata': {
+                            'query_id': query_id,
+                            'is_perturbed': True,
+                            'changes_made': pert.get('changes_made', ''),
+                            'original_prompt': original_prompt
+                        }
+                    })
+        
+        # 3. Add compound perturbation
+        compound = perturbations.get('compound_perturbation', {})
+        compound_prompt = compound.get('perturbed_nl_prompt')
+        
+        if compound_prompt:
+            test_cases.append({
+                'prompt_id': f"{query_id}_compound",
+                'prompt_text': compound_prompt,
+                'sql': gold_sql,
+                'gold_normalized': gold_normalized,
+                'complexity': complexity,
+                'tables': tables,
+                'perturbation_type': 'compound',
+                'perturbation_id': 'compound',
+                'metadata': {
+                    'query_id': query_id,
+                    'is_perturbed': True,
+                    'changes_made': compound.get('changes_made', ''),
+                    'original_prompt': original_prompt,
+                    'perturbations_applied': compound.get('perturbations_applied', [])
+                }
+            })
+    
+    else:
+        # Fallback for simple format without perturbations
+        nl_prompt = query_item.get('nl_prompt', query_item.get('prompt_text', ''))
+        if nl_prompt:
+            test_cases.append({
+                'prompt_id': str(query_id),
+                'prompt_text': nl_prompt,
+                'sql': gold_sql,
+                'gold_normalized': gold_normalized,
+                'complexity': complexity,
+                'tables': tables,
+                'perturbation_type': 'original',
+                'perturbation_id': 0,
+                'metadata': {
+                    'query_id': query_id,
+                    'is_perturbed': False
+                }
+            })
+    
+    return test_cases
@@ -3,12 +3,120 @@ Output Normalization Component.
 Responsible for cleaning raw LLM outputs and extracting valid SQL.
 Enhanced with semantic normalization for fair comparison.
 """
+import functools
 import re
 import sqlglot
+from sqlglot import exp as _exp
 
+# Bound once so the per-node isinstance chain in normalize_ast skips the
+# LOAD_GLOBAL + LOAD_ATTR pair on every visit
+_JOIN = _exp.Join
+_SELECT = _exp.Select
+_STAR = _exp.Star
+_COLUMN = _exp.Column
+
+# Optional compiled fast path: if a native extension (PyO3/Cython build of the
+# normalizer) is present it takes over the parse-dominated work; otherwise the
+# pure-Python sqlglot pipeline below is used. Installing `sqlglotrs` also
+# transparently swaps sqlglot's tokenizer for its Rust implementation.
+try:
+    from ._normalization_native import normalize_sql_native as _native_normalize
+except ImportError:
+    _native_normalize = None
+
+# Compiled once at import: these run on every LLM output, so avoid paying
+# pattern compilation (and re's cache lookups) on each call.
+_WS_RE = re.compile(r"\s+")
+_INNER_JOIN_RE = re.compile(r"\bINNER\s+JOIN\b", re.IGNORECASE)
+_DATE_SUB_RE = re.compile(r"DATE_SUB\s*\(\s*NOW\s*\(\s*\)\s*,\s*INTERVAL\s+([^)]+)\)", re.IGNORECASE)
+_DATE_ADD_RE = re.compile(r"DATE_ADD\s*\(\s*NOW\s*\(\s*\)\s*,\s*INTERVAL\s+([^)]+)\)", re.IGNORECASE)
+
+_KEYWORDS = ['SELECT', 'FROM', 'WHERE', 'JOIN', 'ON', 'INSERT', 'INTO',
+             'UPDATE', 'SET', 'DELETE', 'VALUES', 'ORDER', 'BY', 'GROUP',
+             'HAVING', 'LIMIT', 'AS', 'AND', 'OR', 'NOT', 'IN', 'LIKE']
+# Keyword uppercasing as one identifier scan + O(1) set lookups instead of a
+# keyword alternation: the identifier pattern is a tight character-class loop
+# with no backtracking, and membership is a frozenset probe. INNER rides along
+# so a single literal replace can normalize INNER JOIN afterwards.
+_IDENT_RE = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+_UPPER_SET = frozenset(_KEYWORDS) | {'INNER'}
+
+
+def _upper_keywords(sql: str) -> str:
+    """Uppercase SQL keywords in a single linear scan over the string."""
+    parts = []
+    last = 0
+    for m in _IDENT_RE.finditer(sql):
+        word = m.group(0)
+        upper = word.upper()
+        if upper != word and upper in _UPPER_SET:
+            parts.append(sql[last:m.start()])
+            parts.append(upper)
+            last = m.end()
+    if not parts:
+        return sql
+    parts.append(sql[last:])
+    return ''.join(parts)
+
+# Import-time sanity checks (stripped under -O): a doubled backslash turns
+# these patterns into silent no-ops rather than errors, so fail loudly here.
+if __debug__:
+    assert _WS_RE.sub(' ', 'a  b') == 'a b'
+    assert _INNER_JOIN_RE.search('INNER  JOIN') is not None
+
+# Parse trees keyed by (sql, dialect): gold SQL repeats across every
+# perturbation of its base query and generated SQL repeats across runs, so
+# the parse is paid once per distinct string. Bounded by wholesale clear —
+# the simple scheme beats per-entry LRU bookkeeping at this hit rate.
+_AST_CACHE = {}
+_AST_CACHE_MAX = 50_000
+
+
+def parse_one_cached(sql: str, dialect: str = 'mysql'):
+    """
+    sqlglot.parse_one with a module-level cache on (sql, dialect).
+
+    Returns a copy of the cached tree so callers (e.g. normalize_ast) can
+    mutate it without poisoning the cache.
+    """
+    key = (sql, dialect)
+    ast = _AST_CACHE.get(key)
+    if ast is None:
+        if len(_AST_CACHE) >= _AST_CACHE_MAX:
+            _AST_CACHE.clear()
+        ast = _AST_CACHE[key] = sqlglot.parse_one(sql, dialect=dialect)
+    return ast.copy()
+
+
+def _strip_code_fence(s: str) -> str:
+    """
+    Extract the body of a Markdown ``` fence with find/slice instead of a
+    regex. Every LLM response carries either zero or one fence pair, so the
+    branches are near-perfectly predictable and there is no regex engine
+    entry on this per-response path.
+    """
+    i = s.find('```')
+    if i < 0:
+        return s
+    j = s.find('```', i + 3)
+    if j < 0:
+        return s
+    body = s[i + 3:j].lstrip()
+    # Drop the optional language tag ('mysql' before 'sql': longest first)
+    head = body[:5].lower()
+    if head.startswith('mysql'):
+        body = body[5:]
+    elif head.startswith('sql'):
+        body = body[3:]
+    return body.strip()
+
+
+@functools.lru_cache(maxsize=100_000)
 def normalize_sql(raw_output: str) -> str:
     """
     Normalize raw LLM output to extract and standardize executable SQL.
+    Memoized: perturbed prompts of the same query frequently yield identical
+    raw outputs, so repeated calls skip the sqlglot parse entirely.
     
     Strategy:
     1. Remove Markdown code blocks (```sql ... ```).
@@ -24,10 +132,7 @@ def normalize_sql(raw_output: str) -> str:
     cleaned = raw_output.strip()
 
     # 1. Extract from Code Blocks if present
-    code_block_pattern = re.compile(r"```(?:sql|mysql)?\s*(.*?)```", re.DOTALL | re.IGNORECASE)
-    match = code_block_pattern.search(cleaned)
-    if match:
-        cleaned = match.group(1).strip()
+    cleaned = _strip_code_fence(cleaned)
     
     # 2. Strip trailing semicolons (FIX #1: Critical bug - now actually implemented!)
     cleaned = cleaned.rstrip(';').strip()
@@ -42,9 +147,12 @@ def normalize_sql(raw_output: str) -> str:
     return cleaned
 
 
+@functools.lru_cache(maxsize=100_000)
 def semantic_normalize_sql(sql: str) -> str:
     """
     Normalize SQL to a canonical form for semantic comparison.
+    Memoized on the input string (the function is pure and the sqlglot parse
+    dominates its cost); lru_cache is thread-safe under CPython.
     
     Handles:
     - Keyword case normalization (SELECT -> select)
@@ -59,18 +167,26 @@ def semantic_normalize_sql(sql: str) -> str:
     """
     if not sql:
         return ""
-    
+
+    if _native_normalize is not None:
+        return _native_normalize(sql)
+
+    # No text-level fast path here: equivalence checks are string equality
+    # of this function's output, so every input must go through the same
+    # sqlglot render (operator spacing, quote canonicalization, comment
+    # stripping) to compare equal to its canonical twin. The lru_cache above
+    # and the parse cache below already absorb the repeat cost.
     try:
-        # Parse SQL using sqlglot
+        # Parse SQL using sqlglot (cached per distinct string)
         # Use 'mysql' dialect as our gold SQL is MySQL-based
-        parsed = sqlglot.parse_one(sql, dialect='mysql')
+        parsed = parse_one_cached(sql, dialect='mysql')
         
         # Transform to normalized form
         normalized_ast = normalize_ast(parsed)
         
         # Convert back to SQL string in standardized format
-        # Use lowercase keywords, consistent spacing
-        normalized_sql = normalized_ast.sql(dialect='mysql', pretty=False)
+        # (comments dropped here so no text pass has to strip them later)
+        normalized_sql = normalized_ast.sql(dialect='mysql', pretty=False, comments=False)
         
         # Additional text-level normalizations
         normalized_sql = post_process_normalization(normalized_sql)
@@ -84,37 +200,37 @@ def semantic_normalize_sql(sql: str) -> str:
 
 def normalize_ast(ast):
     """
-    Apply semantic normalizations to the SQL AST.
-    
+    Apply semantic normalizations to the SQL AST in one traversal.
+
     Transformations:
     - INNER JOIN -> JOIN (they're identical)
     - SELECT table.* -> SELECT * in single-table queries
     - Normalize function names (DATE_SUB vs datetime arithmetic)
+
+    Both rewrites ride a single transform() walk instead of two full
+    find_all() sweeps over the tree.
     """
-    from sqlglot import exp
-    
-    # Normalize JOIN types
-    for join in ast.find_all(exp.Join):
-        # INNER JOIN and JOIN are the same - normalize to JOIN
-        if join.args.get('kind') == 'INNER':
-            join.args['kind'] = None  # Default JOIN
-    
-    # PRIORITY 1 FIX: Normalize SELECT table.* to SELECT * in single-table queries
-    for select in ast.find_all(exp.Select):
-        # Check if this is a single-table query (no joins)
-        from_clause = select.args.get('from')
-        if from_clause:
-            joins = select.args.get('joins')
-            is_single_table = not joins or len(joins) == 0
-            
-            if is_single_table and select.expressions:
-                # In single-table context, normalize SELECT table.* to SELECT *
-                for expr in select.expressions:
-                    if isinstance(expr, exp.Star):
+    def _norm(node):
+        if isinstance(node, _JOIN):
+            # INNER JOIN and JOIN are the same - normalize to JOIN
+            if node.args.get('kind') == 'INNER':
+                node.args['kind'] = None  # Default JOIN
+        elif isinstance(node, _SELECT):
+            # PRIORITY 1 FIX: in single-table queries (no joins), normalize
+            # SELECT table.* to SELECT *
+            # (sqlglot >= 27 stores the FROM clause under 'from_')
+            from_clause = node.args.get('from') or node.args.get('from_')
+            if from_clause and not node.args.get('joins') and node.expressions:
+                for expr in node.expressions:
+                    if isinstance(expr, _STAR):
                         # Remove table qualifier
                         expr.set('table', None)
-    
-    return ast
+                    elif isinstance(expr, _COLUMN) and isinstance(expr.this, _STAR):
+                        # sqlglot parses table.* as Column(this=Star, table=...)
+                        expr.replace(_exp.Star())
+        return node
+
+    return ast.transform(_norm, copy=False)
 
 
 def normalize_mysql_functions(sql: str) -> str:
@@ -126,48 +242,30 @@ def normalize_mysql_functions(sql: str) -> str:
     - DATE_ADD(NOW(), INTERVAL X unit) -> NOW() + INTERVAL X unit
     """
     # DATE_SUB(NOW(), INTERVAL X unit) -> NOW() - INTERVAL X unit
-    sql = re.sub(
-        r'DATE_SUB\s*\(\s*NOW\s*\(\s*\)\s*,\s*INTERVAL\s+([^)]+)\)',
-        r'NOW() - INTERVAL \1',
-        sql,
-        flags=re.IGNORECASE
-    )
-    
-    # DATE_ADD(NOW(), INTERVAL X unit) -> NOW() + INTERVAL X unit  
-    sql = re.sub(
-        r'DATE_ADD\s*\(\s*NOW\s*\(\s*\)\s*,\s*INTERVAL\s+([^)]+)\)',
-        r'NOW() + INTERVAL \1',
-        sql,
-        flags=re.IGNORECASE
-    )
-    
+    sql = _DATE_SUB_RE.sub(r'NOW() - INTERVAL \1', sql)
+
+    # DATE_ADD(NOW(), INTERVAL X unit) -> NOW() + INTERVAL X unit
+    sql = _DATE_ADD_RE.sub(r'NOW() + INTERVAL \1', sql)
+
     return sql
 
 
 def post_process_normalization(sql: str) -> str:
     """
     Apply final text-level normalizations after AST conversion.
+
+    Only handles what the AST pass cannot: MySQL function equivalences. The
+    JOIN-kind and SELECT table.* rewrites already happened at the AST level
+    (re-running the table.* pattern here would also wrongly fire on join
+    queries), and the whitespace collapse + uppercase are fused into a single
+    sweep instead of separate passes.
     """
     # PRIORITY 2: Normalize MySQL function equivalences first
     sql = normalize_mysql_functions(sql)
-    
-    # PRIORITY 1 (text-level fallback): Normalize SELECT table.* to SELECT *
-    # Handles cases where AST normalization doesn't persist through sqlglot rendering
-    sql = re.sub(r'SELECT\s+([a-zA-Z0-9_]+)\.\*\s+FROM', r'SELECT * FROM', sql, flags=re.IGNORECASE)
-    
-    # Normalize whitespace
-    sql = re.sub(r'\\s+', ' ', sql)
-    
-    # Remove unnecessary parentheses around single column in SELECT
-    # e.g., SELECT (col) -> SELECT col
-    sql = re.sub(r'SELECT\\s+\\(([a-zA-Z0-9_\\.]+)\\)', r'SELECT \\1', sql)
-    
-    # Normalize INNER JOIN to JOIN
-    sql = re.sub(r'\\bINNER\\s+JOIN\\b', 'JOIN', sql, flags=re.IGNORECASE)
-    
-    # Normalize case
-    sql = sql.upper()
-    
+
+    # Collapse whitespace and normalize case in one sweep
+    sql = _WS_RE.sub(' ', sql).upper()
+
     return sql
 
 
@@ -176,22 +274,11 @@ def basic_text_normalization(sql: str) -> str:
     Fallback normalization when AST parsing fails.
     Applies basic text-level transformations.
     """
-    # Strip and normalize whitespace
-    sql = sql.strip()
-    sql = re.sub(r'\\s+', ' ', sql)
-    
-    # Remove trailing semicolon
-    sql = sql.rstrip(';')
-    
-    # Normalize common variations
-    sql = re.sub(r'\\bINNER\\s+JOIN\\b', 'JOIN', sql, flags=re.IGNORECASE)
-    
-    # Uppercase keywords (basic attempt)
-    keywords = ['SELECT', 'FROM', 'WHERE', 'JOIN', 'ON', 'INSERT', 'INTO', 
-                'UPDATE', 'SET', 'DELETE', 'VALUES', 'ORDER', 'BY', 'GROUP',
-                'HAVING', 'LIMIT', 'AS', 'AND', 'OR', 'NOT', 'IN', 'LIKE']
-    
-    for keyword in keywords:
-        sql = re.sub(r'\\b' + keyword + r'\\b', keyword.upper(), sql, flags=re.IGNORECASE)
-    
-    return sql
+    # Collapse whitespace (C-speed split/join) and strip the trailing semicolon
+    sql = ' '.join(sql.split()).rstrip(';').strip()
+
+    # Uppercase keywords in one identifier scan with set lookups
+    sql = _upper_keywords(sql)
+
+    # INNER was uppercased by the scan, so one literal replace normalizes it
+    return sql.replace('INNER JOIN', 'JOIN')
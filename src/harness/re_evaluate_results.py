@@ -5,7 +5,10 @@ Compares old evaluation (with bugs) vs new evaluation (with fixes).
 """
 
 import json
+import os
 import sys
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from collections import defaultdict
 from tqdm import tqdm
@@ -15,89 +18,145 @@ sys.path.insert(0, str(Path(__file__).parent.parent.parent))
 
 from src.harness.core.evaluation import Evaluator
 
+# orjson parses/serializes in C and works on bytes; fall back to stdlib json
+# where the wheel is unavailable.
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Below this many records, process-pool startup costs more than the
+# re-evaluation work it parallelizes.
+_PARALLEL_REVAL_THRESHOLD = 512
+
+# One Evaluator per worker process, created lazily on first record
+_worker_evaluator = None
+
+
+def _re_evaluate_record(record):
+    """
+    Re-evaluate a single record with the fast evaluator.
+
+    Module-level (rather than a closure) so ProcessPoolExecutor can pickle
+    it; each worker keeps its own Evaluator and normalization caches.
+    """
+    global _worker_evaluator
+    if _worker_evaluator is None:
+        _worker_evaluator = Evaluator()
+
+    new_result = _worker_evaluator.fast_evaluate(record['gold_sql'], record['normalized_sql'])
+
+    # Mutate in place: records are streamed straight to the output file, so
+    # nobody else holds a reference and the copy would be pure allocator churn.
+    record['old_evaluation_result'] = record['evaluation_result']
+    record['evaluation_result'] = {
+        'correctness': new_result.execution_match,
+        'similarity_score': new_result.similarity_score,
+        'failure_type': new_result.failure_type
+    }
+    return record
+
+
+def _loads(line):
+    """Parse one JSONL line (orjson's C parser when available)."""
+    return orjson.loads(line) if orjson is not None else json.loads(line)
+
+
+def _dumps_line(record) -> bytes:
+    """Serialize one record to a JSONL line of bytes."""
+    if orjson is not None:
+        # OPT_SERIALIZE_NUMPY: similarity scores can arrive as numpy floats
+        return orjson.dumps(record, option=orjson.OPT_SERIALIZE_NUMPY) + b'\n'
+    return (json.dumps(record) + '\n').encode('utf-8')
+
+
+def _iter_records(input_file: str):
+    """Yield parsed records one line at a time; never holds the file in RAM."""
+    with open(input_file, 'rb') as fin:
+        for line in fin:
+            if line.strip():
+                yield _loads(line)
+
+
 def re_evaluate_results(input_file: str, output_file: str):
     """Re-evaluate all results with enhanced evaluator."""
-    
+
     print(f"Loading results from: {input_file}")
-    
-    # Load all results
-    results = []
-    with open(input_file, 'r') as f:
-        for line in f:
-            if line.strip():
-                results.append(json.loads(line))
-    
-    print(f"Loaded {len(results)} records")
+
+    # One cheap pass for the record count (pool decision + progress total)
+    # instead of materializing every parsed record up front. The distinct
+    # gold-SQL warm-up pass is gone: semantic_normalize_sql's lru_cache
+    # dedupes gold parses online as the stream goes by.
+    with open(input_file, 'rb') as f:
+        total = sum(1 for line in f if line.strip())
+
+    print(f"Found {total} records")
     print(f"\nRe-evaluating with enhanced evaluator...")
+
+    # Statistics: correctness flags and label codes are collected into
+    # preallocated arrays during the stream; all counting happens after the
+    # loop as vectorized reductions instead of eight Python increments per
+    # record.
+    old_c = np.empty(total, dtype=bool)
+    new_c = np.empty(total, dtype=bool)
+    compl_codes = np.empty(total, dtype=np.int32)
+    pert_codes = np.empty(total, dtype=np.int32)
+    compl_labels = {}
+    pert_labels = {}
     
-    evaluator = Evaluator()
-    
-    # Statistics
+    # Re-evaluate all records: each record is independent and CPU-bound
+    # (sqlglot parse + AST walks), so large runs fan out across cores while
+    # the stats reduction stays in the driver. Input parsing, evaluation, and
+    # output writing are all streamed, so peak memory stays flat in N.
+    if total >= _PARALLEL_REVAL_THRESHOLD:
+        executor = ProcessPoolExecutor(max_workers=os.cpu_count())
+        record_iter = executor.map(_re_evaluate_record, _iter_records(input_file), chunksize=128)
+    else:
+        executor = None
+        record_iter = map(_re_evaluate_record, _iter_records(input_file))
+
+    print(f"Streaming re-evaluated results to: {output_file}")
+    try:
+        with open(output_file, 'wb', buffering=1 << 20) as fout:
+            for i, new_record in enumerate(tqdm(record_iter, total=total, desc="Re-evaluating")):
+                fout.write(_dumps_line(new_record))
+
+                # Record raw flags/labels; the counting is deferred
+                old_c[i] = new_record['old_evaluation_result']['correctness']
+                new_c[i] = new_record['evaluation_result']['correctness']
+                compl = new_record['query_complexity']
+                compl_codes[i] = compl_labels.setdefault(compl, len(compl_labels))
+                pert = new_record['perturbation_type']
+                pert_codes[i] = pert_labels.setdefault(pert, len(pert_labels))
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    # Vectorized stats reduction: boolean masks over contiguous buffers
+    to_correct = ~old_c & new_c
+    to_incorrect = old_c & ~new_c
     stats = {
-        'total': 0,
-        'old_correct': 0,
-        'old_incorrect': 0,
-        'new_correct': 0,
-        'new_incorrect': 0,
-        'changed_to_correct': 0,
-        'changed_to_incorrect': 0,
-        'unchanged': 0,
+        'total': total,
+        'old_correct': int(old_c.sum()),
+        'old_incorrect': int((~old_c).sum()),
+        'new_correct': int(new_c.sum()),
+        'new_incorrect': int((~new_c).sum()),
+        'changed_to_correct': int(to_correct.sum()),
+        'changed_to_incorrect': int(to_incorrect.sum()),
+        'unchanged': int((old_c == new_c).sum()),
     }
-    
+
     changes_by_complexity = defaultdict(lambda: {'to_correct': 0, 'to_incorrect': 0})
     changes_by_perturbation = defaultdict(lambda: {'to_correct': 0, 'to_incorrect': 0})
-    
-    # Re-evaluate all records
-    re_evaluated = []
-    for record in tqdm(results, desc="Re-evaluating"):
-        old_correctness = record['evaluation_result']['correctness']
-        
-        # Re-evaluate with new evaluator (FAST version - no execution verifier!)
-        new_result = evaluator.fast_evaluate(record['gold_sql'], record['normalized_sql'])
-        
-        # Update record with new evaluation
-        new_record = record.copy()
-        new_record['old_evaluation_result'] = record['evaluation_result']
-        new_record['evaluation_result'] = {
-            'correctness': new_result.execution_match,
-            'similarity_score': new_result.similarity_score,
-            'failure_type': new_result.failure_type
-        }
-        
-        re_evaluated.append(new_record)
-        
-        # Track statistics
-        stats['total'] += 1
-        
-        if old_correctness:
-            stats['old_correct'] += 1
-        else:
-            stats['old_incorrect'] += 1
-        
-        if new_result.execution_match:
-            stats['new_correct'] += 1
-        else:
-            stats['new_incorrect'] += 1
-        
-        # Track changes
-        if old_correctness != new_result.execution_match:
-            if new_result.execution_match:
-                stats['changed_to_correct'] += 1
-                changes_by_complexity[record['query_complexity']]['to_correct'] += 1
-                changes_by_perturbation[record['perturbation_type']]['to_correct'] += 1
-            else:
-                stats['changed_to_incorrect'] += 1
-                changes_by_complexity[record['query_complexity']]['to_incorrect'] += 1
-                changes_by_perturbation[record['perturbation_type']]['to_incorrect'] += 1
-        else:
-            stats['unchanged'] += 1
-    
-    # Write re-evaluated results
-    print(f"\nWriting re-evaluated results to: {output_file}")
-    with open(output_file, 'w') as f:
-        for record in re_evaluated:
-            f.write(json.dumps(record) + '\n')
-    
+    for labels, codes, changes in ((compl_labels, compl_codes, changes_by_complexity),
+                                   (pert_labels, pert_codes, changes_by_perturbation)):
+        gained = np.bincount(codes[to_correct], minlength=len(labels))
+        lost = np.bincount(codes[to_incorrect], minlength=len(labels))
+        for label, code in labels.items():
+            if gained[code] or lost[code]:
+                changes[label]['to_correct'] = int(gained[code])
+                changes[label]['to_incorrect'] = int(lost[code])
+
     # Print statistics
     print(f"\n{'='*80}")
     print("RE-EVALUATION RESULTS")
@@ -9,7 +9,54 @@ class ExecutionVerifier:
         self.schema = schema
         self.fks = foreign_keys
         self.fake = Faker()
-        
+
+        # Resolve each column's value source once: the name/type dispatch
+        # ('username' in col, FK scans, ...) used to run per column per row,
+        # repeating the same string searches ~500 times per verify() call.
+        self._row_plans = {
+            table: [self._plan_column(table, col, dtype) for col, dtype in cols.items()]
+            for table, cols in self.schema.items()
+        }
+        self._id_index = {
+            table: list(cols.keys()).index('id')
+            for table, cols in self.schema.items() if 'id' in cols
+        }
+        # Populated :memory: templates keyed by num_rows. Building tables
+        # and fake rows dominates verify(); each call now clones a template
+        # with Connection.backup() (a C-level page copy) instead of
+        # re-running the Python insert loops. Data is therefore fixed per
+        # verifier instance — construct a new verifier for a fresh draw.
+        self._template_conns = {}
+
+    def _plan_column(self, table, col, dtype):
+        """
+        Decide how a column's value is produced, once at construction.
+
+        Returns ('pk', None) for the simple integer primary key,
+        ('fk', source_table) for foreign keys, or ('gen', callable) where the
+        callable is the pre-bound Faker/random generator for the column.
+        """
+        if col == 'id' and dtype == 'int':  # Simple Primary Key assumption
+            return ('pk', None)
+
+        for (t_left, t_right), (k_left, k_right) in self.fks.items():
+            if t_left == table and k_left == col:
+                return ('fk', t_right)
+
+        # Context-aware Faker mapping
+        if 'username' in col: gen = self.fake.user_name
+        elif 'name' in col: gen = self.fake.first_name
+        elif 'email' in col: gen = self.fake.email
+        elif 'country_code' in col: gen = self.fake.country_code
+        elif 'content' in col or 'comment_text' in col: gen = self.fake.sentence
+        elif 'date' in col or '_at' in col: gen = self.fake.date_time_this_year
+        elif dtype == 'boolean': gen = lambda: random.choice([0, 1])
+        elif dtype == 'int': gen = lambda: random.randint(0, 1000)
+        elif dtype == 'text': gen = self.fake.sentence
+        elif dtype == 'varchar': gen = self.fake.word
+        else: gen = self.fake.word
+        return ('gen', gen)
+
     def _get_sqlite_type(self, type_str):
         mapping = {"int": "INTEGER", "varchar": "TEXT", "text": "TEXT", "datetime": "TIMESTAMP", "boolean": "INTEGER"}
         return mapping.get(type_str, "TEXT")
@@ -19,66 +66,59 @@ class ExecutionVerifier:
             col_defs = [f"{col} {self._get_sqlite_type(dtype)}" for col, dtype in cols.items()]
             cursor.execute(f"CREATE TABLE {table} ({', '.join(col_defs)})")
 
-    def _generate_row(self, table, col_types, inserted_ids):
+    def _generate_row(self, table, inserted_ids):
         row = []
-        for col, dtype in col_types.items():
-            # 1. Check if column is a Foreign Key
-            fk_source = None
-            for (t_left, t_right), (k_left, k_right) in self.fks.items():
-                if t_left == table and k_left == col:
-                    fk_source = t_right
-                    break # Found the source
-            
-            val = None
-            # 2. Generate Data
-            if col == 'id' and dtype == 'int': # Simple Primary Key assumption
-                val = len(inserted_ids.get(table, [])) + 1
-            elif fk_source: # Pick valid ID from parent table
-                if fk_source in inserted_ids and inserted_ids[fk_source]:
-                    val = random.choice(inserted_ids[fk_source])
-                else:
-                    val = None
-            else:
-                # Context-aware Faker mapping
-                if 'username' in col: val = self.fake.user_name()
-                elif 'name' in col: val = self.fake.first_name()
-                elif 'email' in col: val = self.fake.email()
-                elif 'country_code' in col: val = self.fake.country_code()
-                elif 'content' in col or 'comment_text' in col: val = self.fake.sentence()
-                elif 'date' in col or '_at' in col: val = self.fake.date_time_this_year()
-                elif dtype == 'boolean': val = random.choice([0, 1])
-                elif dtype == 'int': val = random.randint(0, 1000)
-                elif dtype in ['text', 'varchar']: val = self.fake.sentence() if dtype == 'text' else self.fake.word()
-                else: val = self.fake.word()
-            row.append(val)
+        for kind, arg in self._row_plans[table]:
+            if kind == 'gen':
+                row.append(arg())
+            elif kind == 'pk':
+                row.append(len(inserted_ids.get(table, [])) + 1)
+            else:  # 'fk': pick a valid ID from the parent table
+                parent_ids = inserted_ids.get(arg)
+                row.append(random.choice(parent_ids) if parent_ids else None)
         return tuple(row)
 
-    def verify(self, gold_sql, gen_sql, num_rows=100):
+    def _build_template(self, num_rows):
+        """Create and populate the shared template DB for one row count."""
         conn = sqlite3.connect(":memory:")
         cur = conn.cursor()
-        
+        self._create_tables(cur)
+
+        # Track IDs for FK constraints
+        inserted_ids = {t: [] for t in self.schema.keys()}
+
+        # POPULATION ORDER: Users -> Posts -> Others
+        tables_order = ['users', 'posts', 'comments', 'likes', 'follows']
+
+        for table in tables_order:
+            if table not in self.schema: continue
+            cols = self.schema[table]
+            id_idx = self._id_index.get(table)
+            rows = []
+            for _ in range(num_rows):
+                row = self._generate_row(table, inserted_ids)
+                rows.append(row)
+                if id_idx is not None:
+                    inserted_ids[table].append(row[id_idx])
+
+            placeholders = ', '.join(['?'] * len(cols))
+            cur.executemany(f"INSERT INTO {table} VALUES ({placeholders})", rows)
+
+        conn.commit()
+        return conn
+
+    def verify(self, gold_sql, gen_sql, num_rows=100):
+        conn = sqlite3.connect(":memory:")
+
         try:
-            self._create_tables(cur)
-            
-            # Track IDs for FK constraints
-            inserted_ids = {t: [] for t in self.schema.keys()}
-            
-            # POPULATION ORDER: Users -> Posts -> Others
-            tables_order = ['users', 'posts', 'comments', 'likes', 'follows']
-            
-            for table in tables_order:
-                if table not in self.schema: continue
-                cols = self.schema[table]
-                rows = []
-                for _ in range(num_rows): 
-                    row = self._generate_row(table, cols, inserted_ids)
-                    rows.append(row)
-                    if 'id' in cols: 
-                        id_idx = list(cols.keys()).index('id')
-                        inserted_ids[table].append(row[id_idx])
-                
-                placeholders = ', '.join(['?'] * len(cols))
-                cur.executemany(f"INSERT INTO {table} VALUES ({placeholders})", rows)
+            # Clone the populated template; the copy keeps DML in the
+            # verified queries from leaking into later calls.
+            template = self._template_conns.get(num_rows)
+            if template is None:
+                template = self._template_conns[num_rows] = \
+                    self._build_template(num_rows)
+            template.backup(conn)
+            cur = conn.cursor()
 
             # EXECUTE AND COMPARE
             gold_res = cur.execute(gold_sql).fetchall()
@@ -6,62 +6,131 @@ Loads social_media_queries.json, parses each SQL, renders vanilla + 3 variations
 import json
 import sys
 import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+# orjson serializes multi-MB datasets several times faster than stdlib json;
+# ijson iterates the input array without materializing it during parsing.
+# Both fall back to stdlib json where the wheels are unavailable.
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    import ijson
+except ImportError:
+    ijson = None
 
 # Ensure project root is in path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
 
-from sqlglot import parse_one
+from sqlglot import Dialect
+from tqdm import tqdm
 from src.core.nl_renderer import SQLToNLRenderer
 
 
+# Below this, process-pool spawn cost outweighs the parallel speedup.
+_PARALLEL_THRESHOLD = 64
+
+# Renderer built lazily once per process (parent or pool worker)
+_renderer = None
+
+
+def _get_renderer():
+    global _renderer
+    if _renderer is None:
+        _renderer = SQLToNLRenderer()
+    return _renderer
+
+
+# Hoisted dialect machinery: parse_one would re-resolve the dialect and
+# build a fresh Parser per call; the dialect's tokenizer and one Parser
+# (parse() resets its state) are reused for every cache miss instead.
+_MYSQL = Dialect.get_or_raise('mysql')
+_PARSER = _MYSQL.parser()
+
+
+@lru_cache(maxsize=None)
+def _parse(sql: str):
+    """Parse memoized per SQL string; callers copy before rendering."""
+    return _PARSER.parse(_MYSQL.tokenize(sql), sql)[0]
+
+
+def _render_one(query_data):
+    """
+    Render the vanilla NL prompt for one query.
+
+    Module-level and picklable for pool dispatch; returns the enriched
+    record plus an error message (None on success).
+    """
+    sql = query_data['sql']
+    try:
+        # Copy so the renderer can't mutate the cached tree
+        vanilla_prompt = _get_renderer().render(_parse(sql).copy())
+        query_data['nl_prompt'] = vanilla_prompt
+        if 'nl_prompt_variations' in query_data:
+            del query_data['nl_prompt_variations']
+        return query_data, None
+    except Exception as e:
+        query_data['nl_prompt'] = "[Error: Could not generate NL prompt]"
+        query_data['nl_prompt_variations'] = []
+        return query_data, f"{sql[:50]}... - {e}"
+
+
 def generate_nl_prompts(input_file='./dataset/current/raw_social_media_queries.json', output_file='./dataset/current/nl_social_media_queries.json'):
     """Generate NL prompts with variations for all SQL queries in the dataset."""
-    
-    # Load existing queries
+
+    # Load existing queries (streamed item-by-item when ijson is available)
     print(f"Loading {input_file}...")
-    with open(input_file, 'r') as f:
-        queries = json.load(f)
-    
+    if ijson is not None:
+        with open(input_file, 'rb') as f:
+            # use_float keeps numbers as plain floats (not Decimal) so the
+            # orjson dump below can serialize them
+            queries = list(ijson.items(f, 'item', use_float=True))
+    else:
+        # Binary mode: orjson consumes the bytes natively, skipping a
+        # separate text-decode pass over the whole file
+        with open(input_file, 'rb') as f:
+            raw = f.read()
+        queries = orjson.loads(raw) if orjson is not None else json.loads(raw)
+
     print(f"Loaded {len(queries)} queries.")
-    
-    # Initialize renderer
-    renderer = SQLToNLRenderer()
-    
-    # Process each query
+
+    # Process each query: renders are independent, so large datasets fan
+    # out across cores while small ones stay in-process
     print("Generating natural language prompts with variations...")
     success_count = 0
     error_count = 0
-    
-    for i, query_data in enumerate(queries):
-        sql = query_data['sql']
-        
-        try:
-            # Parse SQL
-            ast = parse_one(sql, dialect='mysql')
-            
-            # Generate vanilla
-            vanilla_prompt = renderer.render(ast)
-            
-            # Add to data
-            query_data['nl_prompt'] = vanilla_prompt
-
-            if 'nl_prompt_variations' in query_data:
-                del query_data['nl_prompt_variations']
-            success_count += 1
-            success_count += 1
-            
-        except Exception as e:
-            print(f"Error processing query {i}: {sql[:50]}... - {e}")
-            query_data['nl_prompt'] = "[Error: Could not generate NL prompt]"
-            query_data['nl_prompt_variations'] = []
-            error_count += 1
-    
+
+    def _consume(results):
+        nonlocal success_count, error_count
+        out = []
+        for i, (item, err) in enumerate(tqdm(results, total=len(queries),
+                                             desc="Rendering prompts", unit="query")):
+            if err is None:
+                success_count += 1
+            else:
+                tqdm.write(f"Error processing query {i}: {err}")
+                error_count += 1
+            out.append(item)
+        return out
+
+    if len(queries) >= _PARALLEL_THRESHOLD:
+        with ProcessPoolExecutor() as executor:
+            queries = _consume(executor.map(_render_one, queries, chunksize=64))
+    else:
+        queries = _consume(map(_render_one, queries))
+
     print(f"Successfully generated {success_count} prompts with variations, {error_count} errors.")
     
     # Save updated JSON
     print(f"Saving to {output_file}...")
-    with open(output_file, 'w') as f:
-        json.dump(queries, f, indent=2)
+    if orjson is not None:
+        with open(output_file, 'wb') as f:
+            f.write(orjson.dumps(queries, option=orjson.OPT_INDENT_2))
+    else:
+        with open(output_file, 'w') as f:
+            json.dump(queries, f, indent=2)
     
     print("Done!")
     
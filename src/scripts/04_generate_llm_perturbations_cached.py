@@ -3,6 +3,7 @@ Generate LLM-based perturbations for nl_social_media_queries.json using Gemini
 and context caching, producing nl_social_mediia_queries_llm_perturbedd.json.
 """
 
+import asyncio
 import os
 import sys
 import json
@@ -14,6 +15,13 @@ from dotenv import load_dotenv
 from google import genai
 from google.genai import types
 
+# orjson serializes the checkpoint/final dumps several times faster than
+# stdlib json; fall back to stdlib where the wheel is unavailable.
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 # Ensure project root is in path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../")))
 
@@ -23,6 +31,36 @@ OUTPUT_FILE = "./dataset/current/nl_social_media_queries_llm_perturbed.json"
 MODEL_NAME = "gemini-2.5-flash-lite"
 CACHE_TTL = "12600s"
 DEFAULT_MAX_RPM = 4000
+# Requests in flight at once; throughput is then bounded by RPM, not by
+# one request's round-trip latency.
+MAX_CONCURRENT = 64
+# Results land (and the JSONL sidecar flushes) in waves of this size.
+BATCH_SIZE = 256
+
+
+def dump_json(path: str, data: Any) -> None:
+    if orjson is not None:
+        with open(path, "wb") as f:
+            f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2))
+    else:
+        with open(path, "w") as f:
+            json.dump(data, f, indent=2)
+
+
+def _dumps_line(record: Dict[str, Any]) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(record) + b"\n"
+    return (json.dumps(record) + "\n").encode("utf-8")
+
+
+def _load_jsonl(path: str) -> List[Dict[str, Any]]:
+    loads = orjson.loads if orjson is not None else json.loads
+    records = []
+    with open(path, "rb") as f:
+        for line in f:
+            if line.strip():
+                records.append(loads(line))
+    return records
 
 
 def setup_client() -> genai.Client:
@@ -69,17 +107,33 @@ def clean_json_response(response_text: str) -> str:
     return cleaned_text.strip()
 
 
-class RateLimiter:
-    def __init__(self, max_rpm: int) -> None:
-        self.min_interval = 60.0 / max_rpm
-        self._last_time = 0.0
+class AsyncTokenBucket:
+    """
+    RPM limiter that awaits instead of sleeping the thread.
+
+    Refills continuously at max_rpm/60 tokens per second with one second of
+    burst capacity, so concurrent requests only wait out genuine rate
+    pressure rather than a fixed per-request interval.
+    """
 
-    def wait(self) -> None:
-        now = time.monotonic()
-        elapsed = now - self._last_time
-        if elapsed < self.min_interval:
-            time.sleep(self.min_interval - elapsed)
-        self._last_time = time.monotonic()
+    def __init__(self, max_rpm: int) -> None:
+        self.fill_rate = max_rpm / 60.0
+        self.capacity = max(1.0, self.fill_rate)
+        self.tokens = self.capacity
+        self._last = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity,
+                                  self.tokens + (now - self._last) * self.fill_rate)
+                self._last = now
+                if self.tokens >= 1.0:
+                    self.tokens -= 1.0
+                    return
+                await asyncio.sleep((1.0 - self.tokens) / self.fill_rate)
 
 
 def build_prompt(query: Dict[str, Any]) -> str:
@@ -109,22 +163,40 @@ def process_queries(
     base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../"))
     input_path = os.path.join(base_dir, INPUT_FILE)
     output_path = os.path.join(base_dir, OUTPUT_FILE)
+    # Progress persists to an append-only JSONL sidecar; the JSON array the
+    # downstream scripts read is written once at the end. This replaces the
+    # O(n^2) pattern of rewriting the whole array as a checkpoint.
+    jsonl_path = output_path.replace(".json", ".jsonl")
 
     print(f"Reading from: {input_path}")
     print(f"Writing to: {output_path}")
 
-    with open(input_path, "r") as f:
-        queries = json.load(f)
+    # Binary mode: orjson consumes the bytes natively, skipping a separate
+    # text-decode pass over the whole file
+    with open(input_path, "rb") as f:
+        raw = f.read()
+    queries = orjson.loads(raw) if orjson is not None else json.loads(raw)
 
     processed_data: List[Dict[str, Any]] = []
     processed_ids = set()
-    if os.path.exists(output_path):
+    if os.path.exists(jsonl_path):
+        try:
+            processed_data = _load_jsonl(jsonl_path)
+            processed_ids = {item["id"] for item in processed_data if "id" in item}
+            print(f"Found existing output with {len(processed_data)} processed queries. Resuming...")
+        except ValueError:
+            print("JSONL file exists but is invalid/empty. Starting fresh.")
+    elif os.path.exists(output_path):
+        # Legacy resume from a run that predates the JSONL sidecar
         try:
-            with open(output_path, "r") as f:
-                processed_data = json.load(f)
-                processed_ids = {item["id"] for item in processed_data if "id" in item}
+            with open(output_path, "rb") as f:
+                raw = f.read()
+            processed_data = orjson.loads(raw) if orjson is not None else json.loads(raw)
+            processed_ids = {item["id"] for item in processed_data if "id" in item}
             print(f"Found existing output with {len(processed_data)} processed queries. Resuming...")
-        except json.JSONDecodeError:
+            with open(jsonl_path, "wb") as f:
+                f.writelines(_dumps_line(item) for item in processed_data)
+        except ValueError:
             print("Output file exists but is invalid/empty. Starting fresh.")
 
     queries_to_process = [q for q in queries if q.get("id") not in processed_ids]
@@ -135,12 +207,13 @@ def process_queries(
     print(f"Remaining: {len(queries_to_process)}")
 
     if not queries_to_process:
+        # Make sure the JSON array downstream readers expect is current
+        dump_json(output_path, processed_data)
         print("All queries processed!")
         return
 
     client = None
     cache = None
-    limiter = RateLimiter(max_rpm)
 
     if not mock:
         client = setup_client()
@@ -148,75 +221,110 @@ def process_queries(
         cache = create_cache(client, MODEL_NAME)
         print(f"Cache created: {cache.name}")
 
-    success_count = 0
-    fail_count = 0
+    with open(jsonl_path, "ab") as jsonl_f:
+        success_count, fail_count = asyncio.run(_process_async(
+            client, cache, queries_to_process, processed_data,
+            jsonl_f, mock=mock, max_rpm=max_rpm,
+        ))
 
-    pbar = tqdm(queries_to_process, desc="Processing Queries", unit="query")
+    dump_json(output_path, processed_data)
 
-    for query in pbar:
-        try:
-            if mock:
-                response_text = json.dumps({
-                    "original": {"nl_prompt": query.get("nl_prompt", "")},
-                    "single_perturbations": [],
-                    "compound_perturbation": {
-                        "perturbations_applied": [],
-                        "perturbed_nl_prompt": query.get("nl_prompt", ""),
-                        "changes_made": "mock"
-                    },
-                    "metadata": {}
-                })
-            else:
-                max_retries = 5
-                retry_delay = 2.0
-                last_error = None
-
-                for attempt in range(max_retries):
-                    try:
-                        limiter.wait()
-                        response = client.models.generate_content(
-                            model=MODEL_NAME,
-                            contents=build_prompt(query),
-                            config=types.GenerateContentConfig(cached_content=cache.name),
-                        )
-                        response_text = response.text
-                        last_error = None
-                        break
-                    except Exception as e:
-                        last_error = e
-                        err_msg = str(e).lower()
-                        if "429" in err_msg or "rate" in err_msg:
-                            time.sleep(retry_delay)
-                            retry_delay *= 2
-                            continue
-                        raise
-
-                if last_error is not None:
-                    raise last_error
-
-            cleaned_text = clean_json_response(response_text)
-            perturbation_data = json.loads(cleaned_text)
-
-            enriched_query = query.copy()
-            enriched_query["generated_perturbations"] = perturbation_data
-            processed_data.append(enriched_query)
-            success_count += 1
-        except Exception as e:
-            fail_count += 1
-            tqdm.write(f"Failed query ID {query.get('id', 'unknown')}: {e}")
-            # Do not append failed item so it can be retried later
+    print(f"\nCompleted. Success: {success_count}, Fail: {fail_count}")
+    print(f"Results saved to {output_path}")
 
-        pbar.set_postfix({"Success": success_count, "Fail": fail_count})
 
-        if success_count % 10 == 0:
-            with open(output_path, "w") as f:
-                json.dump(processed_data, f, indent=2)
+def _mock_response_text(query: Dict[str, Any]) -> str:
+    return json.dumps({
+        "original": {"nl_prompt": query.get("nl_prompt", "")},
+        "single_perturbations": [],
+        "compound_perturbation": {
+            "perturbations_applied": [],
+            "perturbed_nl_prompt": query.get("nl_prompt", ""),
+            "changes_made": "mock"
+        },
+        "metadata": {}
+    })
+
+
+async def _process_async(
+    client,
+    cache,
+    queries_to_process: List[Dict[str, Any]],
+    processed_data: List[Dict[str, Any]],
+    jsonl_f,
+    mock: bool,
+    max_rpm: int,
+) -> tuple:
+    """
+    Drive generation with async concurrency instead of one blocking call at
+    a time: up to MAX_CONCURRENT requests fly together through the SDK's aio
+    client, the token bucket enforces RPM without per-request sleeps, and
+    each success appends one line to the JSONL sidecar (flushed per batch
+    wave) so crash recovery costs O(1) per record, not a full-array rewrite.
+    """
+    limiter = AsyncTokenBucket(max_rpm)
+    sem = asyncio.Semaphore(MAX_CONCURRENT)
+
+    async def one(query: Dict[str, Any]) -> str:
+        async with sem:
+            retry_delay = 2.0
+            last_error = None
+            for attempt in range(5):
+                try:
+                    await limiter.acquire()
+                    response = await client.aio.models.generate_content(
+                        model=MODEL_NAME,
+                        contents=build_prompt(query),
+                        config=types.GenerateContentConfig(cached_content=cache.name),
+                    )
+                    return response.text
+                except Exception as e:
+                    last_error = e
+                    err_msg = str(e).lower()
+                    if "429" in err_msg or "rate" in err_msg:
+                        await asyncio.sleep(retry_delay)
+                        retry_delay *= 2
+                        continue
+                    raise
+            raise last_error
 
-    with open(output_path, "w") as f:
-        json.dump(processed_data, f, indent=2)
+    success_count = 0
+    fail_count = 0
+    pbar = tqdm(total=len(queries_to_process), desc="Processing Queries", unit="query")
+
+    for start in range(0, len(queries_to_process), BATCH_SIZE):
+        batch = queries_to_process[start:start + BATCH_SIZE]
+
+        if mock:
+            results = [_mock_response_text(q) for q in batch]
+        else:
+            results = await asyncio.gather(*(one(q) for q in batch),
+                                           return_exceptions=True)
+
+        for query, result in zip(batch, results):
+            try:
+                if isinstance(result, BaseException):
+                    raise result
+                cleaned_text = clean_json_response(result)
+                perturbation_data = json.loads(cleaned_text)
+
+                enriched_query = query.copy()
+                enriched_query["generated_perturbations"] = perturbation_data
+                processed_data.append(enriched_query)
+                jsonl_f.write(_dumps_line(enriched_query))
+                success_count += 1
+            except Exception as e:
+                fail_count += 1
+                tqdm.write(f"Failed query ID {query.get('id', 'unknown')}: {e}")
+                # Do not append failed item so it can be retried later
+
+            pbar.update(1)
 
-    print(f"\nCompleted. Success: {success_count}, Fail: {fail_count}")
-    print(f"Results saved to {output_path}")
+        pbar.set_postfix({"Success": success_count, "Fail": fail_count})
+        jsonl_f.flush()
+
+    pbar.close()
+    return success_count, fail_count
 
 
 if __name__ == "__main__":
@@ -7,6 +7,13 @@ import os
 import uuid
 import json
 
+# orjson's C parser for the resume scan; fall back to stdlib json where the
+# wheel is unavailable.
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 # Ensure src is in path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
 
@@ -40,15 +47,20 @@ def main():
     # Already processed prompt IDs (Resume logic)
     processed_ids = set()
     if os.path.exists(args.output):
-        with open(args.output, 'r') as f:
+        # Cheap substring prefilter: a line can only belong to this run if the
+        # run_id literal appears in it, and the C-speed `in` check skips the
+        # full JSON decode for every other experiment's records.
+        run_id_bytes = run_id.encode('utf-8')
+        with open(args.output, 'rb') as f:
             for line in f:
-                if line.strip():
-                    try:
-                        record = json.loads(line)
-                        if record['run_id'] == run_id:
-                            processed_ids.add(record['prompt_id'])
-                    except json.JSONDecodeError:
-                        pass
+                if run_id_bytes not in line:
+                    continue
+                try:
+                    record = orjson.loads(line) if orjson is not None else json.loads(line)
+                    if record['run_id'] == run_id:
+                        processed_ids.add(record['prompt_id'])
+                except ValueError:  # covers both json and orjson decode errors
+                    pass
     print(f"Found {len(processed_ids)} already processed prompts for this Run ID.")
 
     for experiment in experiments:
@@ -74,7 +86,7 @@ def main():
             original_load = engine._load_prompts
             def load_and_filter(path):
                 data = original_load(path)
-                filtered = [d for d in data if str(d.get('id', '')) not in processed_ids]
+                filtered = data.filter(lambda case: str(case.get('id', '')) not in processed_ids)
                 if len(filtered) < len(data):
                     print(f"Skipping {len(data) - len(filtered)} already processed items.")
                 return filtered